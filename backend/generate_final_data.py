@@ -1,53 +1,59 @@
-import csv
-import random
+import numpy as np
+import pandas as pd
 import os
 
 # Define file paths
 # We use 'backend/data' if running from main folder, or just 'data' if inside backend
-base_dir = "data" 
+base_dir = "data"
 if not os.path.exists(base_dir):
     os.makedirs(base_dir)
 
+rng = np.random.default_rng(42)
+
+
+def write_csv(df, path):
+    """Render the whole CSV in memory, then write it in a single buffered call."""
+    data = df.to_csv(index=False)
+    with open(path, 'w', newline='', buffering=1024 * 1024) as f:
+        f.write(data)
+
+
 # --- 1. Generate Training Data (500 Rows) ---
 print("Generating 500 rows for training_data.csv...")
 
 headers = [
-    'account_id', 'company_name', 'industry', 'amount', 'days_overdue', 
-    'payment_history_score', 'shipment_volume_30d', 'shipment_volume_change_30d', 
-    'express_ratio', 'destination_diversity', 'email_opened', 
+    'account_id', 'company_name', 'industry', 'amount', 'days_overdue',
+    'payment_history_score', 'shipment_volume_30d', 'shipment_volume_change_30d',
+    'express_ratio', 'destination_diversity', 'email_opened',
     'contact_attempts', 'dispute_flag', 'customer_tenure_months', 'region', 'outcome'
 ]
 
 industries = ['Manufacturing', 'Retail', 'E-commerce', 'Healthcare', 'Construction', 'Technology', 'Textile']
 regions = ['North', 'South', 'East', 'West', 'Central']
 
-training_rows = []
-for i in range(500):
-    row = [
-        f'ACC{i+1000}',                 # account_id
-        f'Company_{i}',                 # company_name
-        random.choice(industries),      # industry
-        random.randint(5000, 5000000),  # amount
-        random.randint(10, 180),        # days_overdue
-        round(random.uniform(0.0, 1.0), 2), # payment_history_score
-        random.randint(0, 200),         # shipment_volume_30d
-        round(random.uniform(-0.6, 0.8), 2), # shipment_volume_change_30d
-        round(random.uniform(0.0, 1.0), 2),  # express_ratio
-        random.randint(1, 50),          # destination_diversity
-        random.choice([True, False]),   # email_opened
-        random.randint(0, 10),          # contact_attempts
-        random.choice([True, False]),   # dispute_flag
-        random.randint(3, 120),         # customer_tenure_months
-        random.choice(regions),         # region
-        random.choice([0, 1])           # outcome
-    ]
-    training_rows.append(row)
+# Whole columns at once (integer bounds are inclusive, as with random.randint)
+n = 500
+training_df = pd.DataFrame({
+    'account_id': [f'ACC{i+1000}' for i in range(n)],
+    'company_name': [f'Company_{i}' for i in range(n)],
+    'industry': rng.choice(industries, n),
+    'amount': rng.integers(5000, 5000001, n),
+    'days_overdue': rng.integers(10, 181, n),
+    'payment_history_score': rng.uniform(0.0, 1.0, n).round(2),
+    'shipment_volume_30d': rng.integers(0, 201, n),
+    'shipment_volume_change_30d': rng.uniform(-0.6, 0.8, n).round(2),
+    'express_ratio': rng.uniform(0.0, 1.0, n).round(2),
+    'destination_diversity': rng.integers(1, 51, n),
+    'email_opened': rng.choice([True, False], n),
+    'contact_attempts': rng.integers(0, 11, n),
+    'dispute_flag': rng.choice([True, False], n),
+    'customer_tenure_months': rng.integers(3, 121, n),
+    'region': rng.choice(regions, n),
+    'outcome': rng.integers(0, 2, n),
+}, columns=headers)
 
 # Save Training Data
-with open(f'{base_dir}/training_data.csv', 'w', newline='') as f:
-    writer = csv.writer(f)
-    writer.writerow(headers)
-    writer.writerows(training_rows)
+write_csv(training_df, f'{base_dir}/training_data.csv')
 print(f"✅ Created {base_dir}/training_data.csv with 500 rows.")
 
 
@@ -56,36 +62,34 @@ print("Generating demo_data.csv with Hero Account...")
 
 # The "Hero" Account (ACC0001) - EXACTLY as required by the audit
 hero_row = [
-    'ACC0001', 'TechCorp Solutions Pvt Ltd', 'Technology', 2800000, 90, 
+    'ACC0001', 'TechCorp Solutions Pvt Ltd', 'Technology', 2800000, 90,
     0.88, 45, 0.40, 0.65, 18, True, 3, False, 36, 'South', 1
 ]
-
-demo_rows = [hero_row]
+hero_df = pd.DataFrame([hero_row], columns=headers)
 
 # Add 14 random rows
-for i in range(14):
-    demo_rows.append([
-        f'ACC{i+2000}',                 # account_id
-        f'Demo_Client_{i}',             # company_name
-        random.choice(industries),      # industry
-        random.randint(10000, 1000000), # amount
-        random.randint(10, 60),         # days_overdue
-        round(random.uniform(0.5, 0.9), 2), # payment_history_score
-        random.randint(10, 100),        # shipment_volume_30d
-        round(random.uniform(-0.1, 0.2), 2), # shipment_volume_change_30d
-        round(random.uniform(0.2, 0.8), 2),  # express_ratio
-        random.randint(5, 20),          # destination_diversity
-        random.choice([True, False]),   # email_opened
-        random.randint(1, 5),           # contact_attempts
-        False,                          # dispute_flag
-        random.randint(12, 60),         # customer_tenure_months
-        random.choice(regions),         # region
-        0                               # outcome placeholder
-    ])
+n_demo = 14
+random_demo_df = pd.DataFrame({
+    'account_id': [f'ACC{i+2000}' for i in range(n_demo)],
+    'company_name': [f'Demo_Client_{i}' for i in range(n_demo)],
+    'industry': rng.choice(industries, n_demo),
+    'amount': rng.integers(10000, 1000001, n_demo),
+    'days_overdue': rng.integers(10, 61, n_demo),
+    'payment_history_score': rng.uniform(0.5, 0.9, n_demo).round(2),
+    'shipment_volume_30d': rng.integers(10, 101, n_demo),
+    'shipment_volume_change_30d': rng.uniform(-0.1, 0.2, n_demo).round(2),
+    'express_ratio': rng.uniform(0.2, 0.8, n_demo).round(2),
+    'destination_diversity': rng.integers(5, 21, n_demo),
+    'email_opened': rng.choice([True, False], n_demo),
+    'contact_attempts': rng.integers(1, 6, n_demo),
+    'dispute_flag': False,
+    'customer_tenure_months': rng.integers(12, 61, n_demo),
+    'region': rng.choice(regions, n_demo),
+    'outcome': 0,                   # outcome placeholder
+}, columns=headers)
+
+demo_df = pd.concat([hero_df, random_demo_df], ignore_index=True)
 
 # Save Demo Data
-with open(f'{base_dir}/demo_data.csv', 'w', newline='') as f:
-    writer = csv.writer(f)
-    writer.writerow(headers)
-    writer.writerows(demo_rows)
-print(f"✅ Created {base_dir}/demo_data.csv with Hero Account ACC0001.")
\ No newline at end of file
+write_csv(demo_df, f'{base_dir}/demo_data.csv')
+print(f"✅ Created {base_dir}/demo_data.csv with Hero Account ACC0001.")
@@ -2,16 +2,35 @@
 RECOV.AI - FastAPI Backend
 ===========================
 Main API server for debt recovery predictions.  
+
+`python main.py` runs a single worker by default. Multiple workers (one
+process per core, each with its own model copy) need an external account
+store first, since /account/{id} reads a per-process cache:
+    gunicorn -k uvicorn.workers.UvicornWorker -w 4 backend.main:app
+or `WEB_CONCURRENCY=4 python main.py`.
 """
 
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, UploadFile, HTTPException, Request, Response, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List
+from collections import OrderedDict
 import pandas as pd
+import numpy as np
 import io
+import os
+import asyncio
+import hashlib
+import itertools
+import logging
+import threading
+import orjson
 import uvicorn
 
+# Log at INFO by default; per-prediction messages in predictor are DEBUG
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+
 # Import predictor
 try:
     from backend.predictor import RecoveryPredictor
@@ -22,7 +41,8 @@ except:
 app = FastAPI(
     title="RECOV.AI API",
     description="AI-powered debt recovery prediction system",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # CORS Configuration
@@ -34,16 +54,31 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize AI Engine
-try:
-    predictor = RecoveryPredictor()
-    print("✅ AI Engine Loaded Successfully")
-except Exception as e:  
-    print(f"❌ AI Engine Failed to Load:  {e}")
-    predictor = None
+# AI Engine - loaded once per worker process in the startup hook below
+# and shared through app.state (importing this module never loads the model)
+app.state.predictor = None
 
-# In-memory storage for accounts
-accounts_db = {}
+@app.on_event("startup")
+def load_predictor():
+    """Load the model when the worker starts, not at import time"""
+    try:
+        app.state.predictor = RecoveryPredictor()
+        print("✅ AI Engine Loaded Successfully")
+    except Exception as e:  
+        print(f"❌ AI Engine Failed to Load:  {e}")
+        app.state.predictor = None
+
+@app.on_event("shutdown")
+def unload_predictor():
+    """Release the model on worker shutdown"""
+    app.state.predictor = None
+
+def get_predictor(request: Request) -> RecoveryPredictor:
+    """Dependency: the worker's loaded predictor, or 500 if it failed to load"""
+    predictor = request.app.state.predictor
+    if not predictor:
+        raise HTTPException(status_code=500, detail="AI Engine not loaded")
+    return predictor
 
 # ============================================================================
 # PYDANTIC MODELS
@@ -68,26 +103,136 @@ class AccountRequest(BaseModel):
     dispute_flag: Optional[bool] = False
 
 # ============================================================================
-# HELPER FUNCTION
+# HELPER FUNCTIONS
 # ============================================================================
 
-def to_dict(obj):
-    """Convert result to dict, handling both dict and Pydantic models"""
-    if isinstance(obj, dict):
-        return obj
-    elif hasattr(obj, 'dict'):
-        return obj.dict()
-    elif hasattr(obj, 'model_dump'):  # Pydantic v2
-        return obj.model_dump()
-    else: 
-        return dict(obj)
+class LRUDict(OrderedDict):
+    """Dict capped at `maxsize` entries; the least recently used is evicted"""
+    
+    def __init__(self, maxsize=10_000):
+        super().__init__()
+        self.maxsize = maxsize
+        self._lock = threading.RLock()
+    
+    def __getitem__(self, key):
+        with self._lock:
+            value = super().__getitem__(key)
+            self.move_to_end(key)
+            return value
+    
+    def __setitem__(self, key, value):
+        with self._lock:
+            if key in self:
+                self.move_to_end(key)
+            super().__setitem__(key, value)
+            if len(self) > self.maxsize:
+                self.popitem(last=False)
+    
+    def snapshot_keys(self):
+        """Keys as a list, copied under the lock so concurrent writes can't break iteration"""
+        with self._lock:
+            return list(self.keys())
+
+# In-memory cache of prediction results: account_id -> (response dict, ETag).
+# NOTE: this lives in each worker's own memory. With WEB_CONCURRENCY > 1 an
+# account uploaded through one worker is invisible to the others, so
+# /account/{id} needs an external store (e.g. Redis) for multi-worker use.
+accounts_db = LRUDict(maxsize=10_000)
+
+# Bumped on every insert; versions the /accounts/list ETag
+_accounts_counter = itertools.count(1)
+accounts_version = 0
+
+# Predictions are deterministic, so clients may reuse a response briefly
+CACHE_CONTROL = "private, max-age=60"
+# The account list changes on every /predict or /analyze: always revalidate
+LIST_CACHE_CONTROL = "private, no-cache"
+
+def cache_result(result_dict: dict):
+    """Store a prediction together with its ETag (hashed once, at write time)"""
+    global accounts_version
+    etag = '"' + hashlib.md5(orjson.dumps(result_dict), usedforsecurity=False).hexdigest() + '"'
+    accounts_db[result_dict['account_id']] = (result_dict, etag)
+    accounts_version = next(_accounts_counter)
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True if the client's If-None-Match already names this ETag"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return header.strip() == "*" or etag in (tag.strip() for tag in header.split(","))
+
+# Columns /analyze reads from an uploaded CSV, with dtypes declared up front
+# so the C parser converts them directly instead of inferring types. String
+# columns keep values verbatim (leading zeros survive, blanks stay NaN);
+# numeric columns stay float64 so blank cells parse as NaN instead of
+# failing an integer cast.
+_CSV_DTYPES = {
+    'account_id': str,
+    'company_name': str,
+    'industry': str,
+    'region': str,
+    'amount': 'float64',
+    'days_overdue': 'float64',
+    'payment_history_score': 'float64',
+    'shipment_volume_change_30d': 'float64',
+    'shipment_volume_30d': 'float64',
+    'express_ratio': 'float64',
+    'destination_diversity': 'float64',
+    'contact_attempts': 'float64',
+    'customer_tenure_months': 'float64',
+}
+# TRUE/FALSE flags are left to the parser's boolean detection
+_CSV_COLUMNS = set(_CSV_DTYPES) | {'email_opened', 'dispute_flag'}
+
+def _read_accounts_csv(contents: bytes) -> pd.DataFrame:
+    """Parse an uploaded accounts CSV, keeping only the columns the model uses"""
+    # dtype entries for columns absent from the file are ignored by the C parser
+    return pd.read_csv(io.BytesIO(contents), usecols=lambda col: col in _CSV_COLUMNS,
+                       dtype=_CSV_DTYPES, engine="c")
+
+# Rows scored per model call when /analyze streams NDJSON
+STREAM_CHUNK_SIZE = 256
+
+def _predict_and_cache(predictor: RecoveryPredictor, df: pd.DataFrame) -> list:
+    """Batch-predict a frame, add the original amount/days and cache each result"""
+    predictions = predictor.predict_recovery_batch(df)
+    
+    # ✅ NEW: Include original account data in response
+    # Using safe casting to ensure frontend doesn't break
+    # (.tolist() already yields Python float / int)
+    amounts = pd.to_numeric(df['amount'], errors='coerce').fillna(0).astype(float).tolist()
+    days = pd.to_numeric(df['days_overdue'], errors='coerce').fillna(0).astype(int).tolist()
+    for result_dict, amount, days_overdue in zip(predictions, amounts, days):
+        result_dict['amount'] = amount
+        result_dict['days_overdue'] = days_overdue
+        
+        # Cache the result so /account/{id} never re-runs the model
+        cache_result(result_dict)
+    
+    return predictions
+
+def _summarize(predictions: list) -> dict:
+    """Count predictions per probability band"""
+    probs = np.array([p['recovery_probability'] for p in predictions])
+    return {
+        "high_probability": int(np.sum(probs > 0.7)),
+        "medium_probability": int(np.sum((probs > 0.4) & (probs <= 0.7))),
+        "low_probability": int(np.sum(probs <= 0.4)),
+    }
+
+# Pick the Pydantic v2 / v1 dump method once instead of probing per call
+if hasattr(BaseModel, 'model_dump'):
+    _dump = lambda obj: obj.model_dump()
+else:
+    _dump = lambda obj: obj.dict()
 
 # ============================================================================
 # API ENDPOINTS
 # ============================================================================
 
 @app.get("/")
-def home():
+def home(request: Request):
     """Health check endpoint"""
     return {
         "status":  "RECOV.AI Backend Running",
@@ -98,35 +243,33 @@ def home():
             "batch_analysis": "POST /analyze",
             "get_account": "GET /account/{account_id}"
         },
-        "ai_engine":  "Loaded" if predictor else "Error"
+        "ai_engine":  "Loaded" if request.app.state.predictor else "Error"
     }
 
+# NOTE: /predict and /account stay plain `def` on purpose - Starlette runs
+# sync endpoints in its threadpool, so their CPU work never blocks the loop.
+# /analyze is `async` for the upload and offloads its blocking steps explicitly.
+
 @app.post("/predict")
-def predict_single(data: AccountRequest):
+def predict_single(data: AccountRequest, predictor: RecoveryPredictor = Depends(get_predictor)):
     """
     Predict recovery for a single account.  
     
     **Day 3 Requirement:** Single account prediction endpoint
     """
-    if not predictor: 
-        raise HTTPException(status_code=500, detail="AI Engine not loaded")
-    
     try:
         # Convert to dict
-        account_data = data.dict()
+        account_data = _dump(data)
         
-        # Store in memory
-        accounts_db[account_data['account_id']] = account_data
+        # Get prediction (already a plain dict)
+        result_dict = predictor.predict_recovery(account_data)
         
-        # Get prediction
-        result = predictor.predict_recovery(account_data)
-        
-        # Ensure it's a dict
-        result_dict = to_dict(result)
-        
-        # Add original data back
-        result_dict['amount'] = float(account_data.get('amount', 0))
-        result_dict['days_overdue'] = int(account_data.get('days_overdue', 0))
+        # Add original data back (already float / int via AccountRequest)
+        result_dict['amount'] = account_data['amount']
+        result_dict['days_overdue'] = account_data['days_overdue']
+
+        # Cache the result so /account/{id} never re-runs the model
+        cache_result(result_dict)
 
         return result_dict
         
@@ -134,19 +277,21 @@ def predict_single(data: AccountRequest):
         raise HTTPException(status_code=500, detail=f"Prediction failed:  {str(e)}")
 
 @app.post("/analyze")
-async def analyze_csv(file: UploadFile = File(...)):
+async def analyze_csv(file: UploadFile = File(...), stream: bool = False,
+                      predictor: RecoveryPredictor = Depends(get_predictor)):
     """
     Analyze multiple accounts from CSV file. 
     
     **Day 3 Requirement:** CSV upload and batch processing
-    """
-    if not predictor:
-        raise HTTPException(status_code=500, detail="AI Engine not loaded")
     
+    With `?stream=true` the response is NDJSON instead: one prediction per
+    line, scored in chunks of STREAM_CHUNK_SIZE rows, followed by a final
+    `{"total_accounts": ..., "summary": {...}}` line.
+    """
     try:
-        # Read CSV file
+        # Read CSV file (parsing is CPU work - keep it off the event loop)
         contents = await file.read()
-        df = pd.read_csv(io.BytesIO(contents))
+        df = await asyncio.to_thread(_read_accounts_csv, contents)
         
         # Validate required columns
         required_cols = ['account_id', 'company_name', 'amount', 'days_overdue', 
@@ -159,34 +304,31 @@ async def analyze_csv(file: UploadFile = File(...)):
                 detail=f"Missing required columns: {missing_cols}"
             )
         
-        # Process each account
-        predictions = []
-        for idx, row in df.iterrows():
-            account_dict = row.to_dict()
-            
-            # Store in memory
-            accounts_db[account_dict['account_id']] = account_dict
-            
-            # Get prediction and convert to dict
-            result = predictor.predict_recovery(account_dict)
-            result_dict = to_dict(result)
-            
-            # ✅ NEW: Include original account data in response
-            # Using safe casting to ensure frontend doesn't break
-            result_dict['amount'] = float(account_dict.get('amount', 0) or 0)
-            result_dict['days_overdue'] = int(account_dict.get('days_overdue', 0) or 0)
+        if stream:
+            # Sync generator: Starlette iterates it in its threadpool, so each
+            # chunk's prediction runs off the event loop while earlier lines
+            # are already on the wire. Only one chunk is held in memory.
+            def generate():
+                summary = {"high_probability": 0, "medium_probability": 0, "low_probability": 0}
+                for start in range(0, len(df), STREAM_CHUNK_SIZE):
+                    chunk = _predict_and_cache(predictor, df.iloc[start:start + STREAM_CHUNK_SIZE])
+                    for key, count in _summarize(chunk).items():
+                        summary[key] += count
+                    for result_dict in chunk:
+                        yield orjson.dumps(result_dict) + b"\n"
+                yield orjson.dumps({"total_accounts": len(df), "summary": summary}) + b"\n"
             
-            predictions.append(result_dict)
+            return StreamingResponse(generate(), media_type="application/x-ndjson")
         
-        return {
+        # Predict every account with a single model call, in a worker thread
+        predictions = await asyncio.to_thread(_predict_and_cache, predictor, df)
+        
+        # Serialize directly with orjson (skips jsonable_encoder for large batches)
+        return ORJSONResponse({
             "total_accounts": len(predictions),
             "predictions": predictions,
-            "summary": {
-                "high_probability": sum(1 for p in predictions if p['recovery_probability'] > 0.7),
-                "medium_probability": sum(1 for p in predictions if 0.4 < p['recovery_probability'] <= 0.7),
-                "low_probability": sum(1 for p in predictions if p['recovery_probability'] <= 0.4),
-            }
-        }
+            "summary": _summarize(predictions)
+        })
         
     except pd.errors.EmptyDataError:
         raise HTTPException(status_code=400, detail="CSV file is empty")
@@ -194,51 +336,56 @@ async def analyze_csv(file: UploadFile = File(...)):
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
 @app.get("/account/{account_id}")
-def get_account(account_id: str):
+def get_account(account_id: str, request: Request):
     """
     Get prediction for a specific account by ID.
     
     **Day 3 Requirement:** Retrieve single account detail
     """
-    if not predictor: 
-        raise HTTPException(status_code=500, detail="AI Engine not loaded")
-    
-    # Check if account exists in memory
-    if account_id not in accounts_db:
+    # The prediction was cached at /predict or /analyze time, so this is a
+    # dict lookup - it neither re-runs the model nor needs it loaded.
+    # Single lookup: the entry could be evicted between a check and a read.
+    try:
+        result_dict, etag = accounts_db[account_id]
+    except KeyError:
         raise HTTPException(
             status_code=404, 
             detail=f"Account {account_id} not found. Upload CSV first via /analyze"
         )
     
-    try: 
-        account_data = accounts_db[account_id]
-        result = predictor.predict_recovery(account_data)
-        
-        # Convert to dict and enrich with original data
-        result_dict = to_dict(result)
-        result_dict['amount'] = float(account_data.get('amount', 0))
-        result_dict['days_overdue'] = int(account_data.get('days_overdue', 0))
-        
-        return result_dict
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return ORJSONResponse(result_dict, headers=headers)
 
 @app.get("/accounts/list")
-def list_accounts():
+def list_accounts(request: Request):
     """List all accounts in memory"""
-    return {
-        "total_accounts": len(accounts_db),
-        "account_ids": list(accounts_db.keys())
-    }
+    account_ids = accounts_db.snapshot_keys()
+    total = len(account_ids)
+    etag = f'"{accounts_version}-{total}"'
+    headers = {"ETag": etag, "Cache-Control": LIST_CACHE_CONTROL}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    
+    return ORJSONResponse({
+        "total_accounts": total,
+        "account_ids": account_ids
+    }, headers=headers)
 
 # ============================================================================
 # RUN SERVER
 # ============================================================================
 
 if __name__ == "__main__":  
+    host = os.getenv("HOST", "127.0.0.1")
+    # One worker by default: accounts_db is per process (see NOTE above it)
+    workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+    
     print("🚀 Starting RECOV.AI Backend Server...")
-    print("📍 Server will run at:  http://127.0.0.1:8000")
-    print("📖 API Docs: http://127.0.0.1:8000/docs")
+    print(f"📍 Server will run at:  http://{host}:8000 ({workers} workers)")
+    print(f"📖 API Docs: http://{host}:8000/docs")
     
-    uvicorn.run(app, host="127.0.0.1", port=8000)
\ No newline at end of file
+    # Workers need an import string; match however the app was launched
+    app_path = "backend.main:app" if os.path.isdir("backend") else "main:app"
+    uvicorn.run(app_path, host=host, port=8000, workers=workers)
\ No newline at end of file
@@ -7,8 +7,12 @@ Falls back gracefully if SHAP is unavailable.
 
 import pandas as pd
 import numpy as np
-import pickle
+import os
+import joblib
+import hashlib
+import functools
 from pathlib import Path
+from joblib import Parallel, delayed, effective_n_jobs
 
 # Try to import SHAP (optional dependency)
 try:
@@ -18,6 +22,56 @@ except ImportError:
     SHAP_AVAILABLE = False
     print("⚠️ SHAP not installed. Using fallback explanations.")
 
+# Faster drop-in tree explainers (optional)
+try:
+    import fasttreeshap
+    FASTTREESHAP_AVAILABLE = True
+except ImportError:
+    FASTTREESHAP_AVAILABLE = False
+
+try:
+    import cupy
+    CUPY_AVAILABLE = True
+except ImportError:
+    CUPY_AVAILABLE = False
+
+
+# Rows kept when summarizing a background dataset with k-means
+BACKGROUND_CLUSTERS = 50
+
+# Smallest row chunk worth handing to its own thread in explain_predictions_batch()
+MIN_ROWS_PER_CHUNK = 256
+
+# Model families by defining module (no need to import the libraries themselves).
+# Only sklearn's tree ensembles: Voting/Stacking/Bagging/AdaBoost also live in
+# sklearn.ensemble but TreeExplainer can't read them, so they go to KernelExplainer
+TREE_MODULES = ('xgboost', 'lightgbm', 'catboost', 'sklearn.tree',
+                'sklearn.ensemble._forest', 'sklearn.ensemble._gb',
+                'sklearn.ensemble._hist_gradient_boosting', 'sklearn.ensemble._iforest')
+LINEAR_MODULES = ('sklearn.linear_model',)
+
+
+def _gpu_available() -> bool:
+    """True when cupy can see at least one CUDA device."""
+    if not CUPY_AVAILABLE:
+        return False
+    try:
+        return cupy.cuda.runtime.getDeviceCount() > 0
+    except Exception:
+        return False
+
+
+def _top_indices(scores: np.ndarray, k: int = 5) -> np.ndarray:
+    """Indices of the k largest scores, descending, ignoring ~zero entries; ties keep column order."""
+    keep = np.flatnonzero(scores >= 1e-10)
+    return keep[np.argsort(-scores[keep], kind='stable')[:k]]
+
+
+@functools.lru_cache(maxsize=4)
+def _load_pickle(path: str, mtime_ns: int):
+    """Load a model file once per file version; keyed on mtime so a rewritten file is reloaded."""
+    return joblib.load(path)
+
 
 class ExplainabilityEngine:
     """
@@ -25,24 +79,54 @@ class ExplainabilityEngine:
     Provides interpretable feature importance for predictions.
     """
     
-    def __init__(self, model_path: str):
+    # Human-readable names for known feature columns
+    NAME_MAP = {
+        'amount_log': 'Invoice Amount (log)',
+        'amount':  'Invoice Amount',
+        'days_overdue': 'Days Overdue',
+        'payment_history_score': 'Payment History Score',
+        'shipment_volume_change_30d': 'Shipment Volume Change (30d)',
+        'shipment_volume_30d': 'Shipment Volume (30d)',
+        'express_ratio': 'Express Shipment Ratio',
+        'destination_diversity': 'Shipping Destination Diversity',
+        'email_opened': 'Email Engagement',
+        'dispute_flag': 'Dispute History'
+    }
+    
+    def __init__(self, model_path: str, background=None, approximate: bool = True):
         """
         Initialize explainer and load model.
         
         Args:
             model_path:  Path to pickled model file
+            background: Optional reference rows; switches the explainer to
+                        interventional mode over a k-means summary of them
+            approximate: Use TreeSHAP's fast Saabas-style approximation
+                         (only the top factors are surfaced)
         """
         self.model = None
+        self.model_dir = None
         self.explainer = None
+        self.explainer_kind = None
+        self.stored_expected_value = None
         self.feature_names = None
-        self. shap_available = SHAP_AVAILABLE
+        self.background = background
+        self.approximate = approximate
+        self.shap_available = SHAP_AVAILABLE
         
         # Load model
         self._load_model(model_path)
         
-        # Initialize SHAP explainer if available
-        if self.shap_available and self.model:
+        # Display names by feature position, computed once
+        self._clean_names = [self._clean_feature_name(n) for n in self.feature_names or []]
+        
+        # Initialize SHAP explainer if available (and not persisted with the model)
+        if self.shap_available and self.model and self.explainer is None:
             self._initialize_explainer()
+        
+        # Per-explainer constants, resolved once
+        self._shap_kwargs = self._shap_call_kwargs()
+        self._base_value = self._expected_value()
 
     def _load_model(self, model_path:  str):
         """
@@ -73,9 +157,10 @@ class ExplainabilityEngine:
             if not model_file.exists():
                 raise FileNotFoundError(f"Model file not found:  {model_path}")
             
-            # Load pickle
-            with open(model_file, 'rb') as f:
-                pkg = pickle.load(f)
+            self.model_dir = model_file.parent
+            
+            # Load pickle (memoized per file version)
+            pkg = _load_pickle(str(model_file), os.stat(model_file).st_mtime_ns)
             
             # Extract model and features based on structure
             if isinstance(pkg, dict):
@@ -103,6 +188,13 @@ class ExplainabilityEngine:
             if not self.model:
                 raise ValueError("Could not extract model from pickle file")
             
+            # Reuse the explainer retrain_model.py saved beside the model
+            if (isinstance(pkg, dict) and pkg.get('explainer') and self.shap_available
+                    and self.background is None):
+                self._load_explainer(model_file.parent / pkg['explainer'])
+                if self.explainer is not None:
+                    self.stored_expected_value = pkg.get('expected_value')
+            
             print(f"✅ Model loaded for SHAP:  {type(self.model).__name__}")
             if self.feature_names:
                 print(f"   Features: {len(self.feature_names)} columns")
@@ -112,24 +204,163 @@ class ExplainabilityEngine:
             self.model = None
             self.feature_names = []
 
+    def _load_explainer(self, explainer_file: Path):
+        """
+        Load a pre-built SHAP explainer; on failure one is built as usual.
+        """
+        try:
+            self.explainer = _load_pickle(str(explainer_file), os.stat(explainer_file).st_mtime_ns)
+            self.explainer_kind = type(self.explainer).__name__
+            print(f"✅ SHAP {self.explainer_kind} loaded from {explainer_file.name}")
+        except Exception as e:
+            print(f"⚠️ Could not load persisted SHAP explainer: {e}")
+            self.explainer = None
+
     def _initialize_explainer(self):
         """
-        Initialize SHAP TreeExplainer for the model.
+        Initialize the fastest explainer for the model. Tree models try
+        FastTreeSHAP, then GPUTree (CUDA), then SHAP TreeExplainer.
         Handles errors gracefully.
         """
         if not self.shap_available:
             print("⚠️ SHAP not available - using fallback")
             return
         
+        family = self._model_family()
+        if family != 'tree':
+            self._initialize_generic_explainer(family)
+            return
+        
+        # Interventional mode against a summarized background, if one was given
+        kwargs = {}
+        if self.background is not None:
+            try:
+                kwargs = {'data': self._summarize_background(self.background),
+                          'feature_perturbation': 'interventional'}
+            except Exception as e:
+                print(f"⚠️ Could not summarize SHAP background: {e}")
+        
+        # Fastest first; all expose the same .shap_values() / .expected_value
+        candidates = []
+        if FASTTREESHAP_AVAILABLE:
+            candidates.append(("FastTreeSHAP", lambda: fasttreeshap.TreeExplainer(
+                self.model, algorithm="v2", n_jobs=-1, **kwargs)))
+        if hasattr(shap, "GPUTreeExplainer") and _gpu_available():
+            candidates.append(("GPUTreeExplainer", lambda: shap.GPUTreeExplainer(self.model, **kwargs)))
+        candidates.append(("TreeExplainer", lambda: shap.TreeExplainer(self.model, **kwargs)))
+
+        # Constructors can succeed without a working backend (e.g. shap wheels
+        # built without the CUDA extension), so each candidate must also
+        # explain one row before it is accepted
+        n_features = len(self.feature_names or []) or getattr(self.model, 'n_features_in_', 0)
+        probe = np.zeros((1, n_features), dtype=np.float32) if n_features else None
+        
+        for kind, build in candidates:
+            try:
+                explainer = build()
+                if probe is not None:
+                    explainer.shap_values(probe)
+                self.explainer = explainer
+                self.explainer_kind = kind
+                print(f"✅ SHAP {kind} initialized")
+                return
+            except Exception as e:
+                print(f"⚠️ Could not initialize SHAP {kind}: {e}")
+
+        self.explainer = None
+
+    def _expected_value(self) -> float:
+        """
+        Base value (expected model output) of the explainer; the value
+        retrain_model.py stored with a persisted explainer is used as is.
+        """
+        if self.stored_expected_value is not None:
+            return float(self.stored_expected_value)
         try:
-            # Initialize TreeExplainer (optimized for tree-based models)
-            self.explainer = shap.TreeExplainer(self.model)
-            print("✅ SHAP TreeExplainer initialized")
-            
+            if isinstance(self.explainer.expected_value, (list, np.ndarray)):
+                return float(self.explainer.expected_value[-1])
+            return float(self.explainer.expected_value)
+        except:
+            return 0.5  # Default for binary classification
+
+    def _shap_call_kwargs(self) -> dict:
+        """
+        approximate=True is only understood by SHAP's own TreeExplainer in
+        tree-path-dependent mode; other explainers get the default call.
+        """
+        if (self.approximate and self.explainer is not None
+                and type(self.explainer) is shap.TreeExplainer
+                and getattr(self.explainer, 'feature_perturbation', None) == 'tree_path_dependent'):
+            return {'approximate': True, 'check_additivity': False}
+        return {}
+
+    def _threads_help(self) -> bool:
+        """
+        Whether row chunks can usefully run on threads: only SHAP's own C++
+        TreeSHAP (interventional mode, or sklearn trees) is single-threaded.
+        XGBoost/LightGBM/CatBoost path-dependent explanations already use the
+        booster's OpenMP pred_contribs, FastTreeSHAP runs its own thread pool,
+        and KernelExplainer holds the GIL.
+        """
+        if type(self.explainer) is not shap.TreeExplainer:
+            return False
+        return (getattr(self.explainer, 'feature_perturbation', None) == 'interventional'
+                or type(self.model).__module__.startswith('sklearn.'))
+
+    def _model_family(self) -> str:
+        """
+        Classify the model as 'tree', 'linear' or 'other' by its module.
+        """
+        module = type(self.model).__module__
+        if module.startswith(TREE_MODULES):
+            return 'tree'
+        if module.startswith(LINEAR_MODULES):
+            return 'linear'
+        return 'other'
+
+    def _initialize_generic_explainer(self, family: str):
+        """
+        LinearExplainer for linear models, KernelExplainer for anything else.
+        Both need the background dataset.
+        """
+        if self.background is None:
+            print(f"⚠️ {type(self.model).__name__} needs a background dataset for SHAP - using fallback")
+            return
+        
+        try:
+            bg = self._summarize_background(self.background)
+            if family == 'linear':
+                self.explainer = shap.LinearExplainer(self.model, bg)
+            else:
+                predict = getattr(self.model, 'predict_proba', self.model.predict)
+                self.explainer = shap.KernelExplainer(predict, bg)
+            self.explainer_kind = type(self.explainer).__name__
+            print(f"✅ SHAP {self.explainer_kind} initialized")
         except Exception as e:
-            print(f"⚠️ Could not initialize SHAP TreeExplainer: {e}")
+            print(f"⚠️ Could not initialize SHAP explainer for {type(self.model).__name__}: {e}")
             self.explainer = None
 
+    def _summarize_background(self, background) -> np.ndarray:
+        """
+        Reduce background rows to BACKGROUND_CLUSTERS k-means centroids.
+        The summary is cached as .npz next to the model, keyed by content.
+        """
+        raw = np.asarray(background, dtype=np.float32)
+        if len(raw) <= BACKGROUND_CLUSTERS:
+            return raw
+        
+        digest = hashlib.md5(raw.tobytes()).hexdigest()[:12]
+        cache_file = self.model_dir / f"shap_background_{digest}.npz"
+        if cache_file.exists():
+            return np.load(cache_file)['data']
+        
+        bg = shap.kmeans(raw, BACKGROUND_CLUSTERS).data
+        try:
+            np.savez(cache_file, data=bg)
+        except OSError as e:
+            print(f"⚠️ Could not cache SHAP background: {e}")
+        return bg
+
     def explain_prediction(self, X_df: pd.DataFrame) -> dict:
         """
         Generate SHAP values for a prediction and return top factors.
@@ -151,71 +382,104 @@ class ExplainabilityEngine:
             print("⚠️ Empty DataFrame provided to SHAP explainer")
             return {'top_factors': []}
         
+        return self.explain_predictions_batch(X_df.iloc[[0]])[0]
+
+    def explain_predictions_batch(self, X_df: pd.DataFrame, n_jobs: int = 1) -> list:
+        """
+        Generate SHAP explanations for many rows in one call, optionally
+        splitting them into row chunks explained on a thread pool.
+        
+        Args:
+            X_df: DataFrame with one row of prepared features per prediction
+            n_jobs: Worker threads (joblib semantics), opt-in; only used for
+                single-threaded explainers, with at least MIN_ROWS_PER_CHUNK rows each
+        
+        Returns:
+            list: one explain_prediction()-style dict per row, in row order
+        """
+        # Validation
+        if X_df is None or X_df.empty:
+            print("⚠️ Empty DataFrame provided to SHAP explainer")
+            return []
+        
         if not self.explainer:
             print("⚠️ SHAP explainer not initialized - using fallback")
-            return self._fallback_explanation(X_df)
+            return [self._fallback_explanation(X_df.iloc[[r]]) for r in range(len(X_df))]
         
         try:
-            # Calculate SHAP values
-            shap_values = self.explainer.shap_values(X_df)
-            
-            # Handle different SHAP output formats
-            # Binary classification: list [class0_values, class1_values]
-            # Multiclass: list of arrays
-            # Regression: single array
-            if isinstance(shap_values, list):
-                # For binary classification, use positive class (index 1)
-                if len(shap_values) == 2:
-                    vals = shap_values[1]
-                else: 
-                    vals = shap_values[0]
+            # Calculate SHAP values for the batch (float32 matrix)
+            X = X_df.to_numpy(dtype=np.float32)
+            n_chunks = 1
+            if n_jobs != 1 and self._threads_help():
+                n_chunks = max(1, min(effective_n_jobs(n_jobs), len(X) // MIN_ROWS_PER_CHUNK))
+            if n_chunks > 1:
+                chunks = np.array_split(X, n_chunks)
+                parts = Parallel(n_jobs=n_chunks, backend='threading')(
+                    delayed(self.explainer.shap_values)(chunk, **self._shap_kwargs) for chunk in chunks
+                )
+                vals = np.vstack([self._positive_class_values(part, len(chunk))
+                                  for part, chunk in zip(parts, chunks)])
             else:
-                vals = shap_values
+                vals = self._positive_class_values(
+                    self.explainer.shap_values(X, **self._shap_kwargs), len(X))
             
-            # Extract values for single prediction
-            if len(vals. shape) > 1:
-                vals = vals[0]  # First row
+            # Top 5 non-zero features per row by absolute impact
+            abs_vals = np.abs(vals)
+            clean_names = self._clean_names_for(X_df.columns)
+            row_values = X_df.to_numpy()  # one materialization instead of iloc per cell
+            numeric_mask = X_df.dtypes.apply(pd.api.types.is_numeric_dtype).to_numpy()
             
-            # Map SHAP values to feature names
-            feature_importance = []
-            feature_names = X_df.columns.tolist()
-            
-            for i, (name, val) in enumerate(zip(feature_names, vals)):
-                # Skip features with zero impact
-                if abs(val) < 1e-10:
-                    continue
-                
-                # Get actual feature value
-                feature_value = X_df. iloc[0, i]
+            explanations = []
+            for r in range(len(vals)):
+                feature_importance = []
+                for i in _top_indices(abs_vals[r]):
+                    val = vals[r, i]
+                    
+                    # Get actual feature value
+                    feature_value = row_values[r, i]
+                    
+                    feature_importance.append({
+                        "feature": clean_names[i],
+                        "impact": float(val),
+                        "direction": "positive" if val > 0 else "negative",
+                        "feature_value": float(feature_value) if numeric_mask[i] else str(feature_value)
+                    })
                 
-                feature_importance.append({
-                    "feature": self._clean_feature_name(name),
-                    "impact": float(val),
-                    "direction": "positive" if val > 0 else "negative",
-                    "feature_value": float(feature_value) if isinstance(feature_value, (int, float)) else str(feature_value)
+                explanations.append({
+                    'top_factors': feature_importance,  # Top 5 factors
+                    'base_value': self._base_value
                 })
             
-            # Sort by absolute impact magnitude
-            feature_importance. sort(key=lambda x: abs(x['impact']), reverse=True)
-            
-            # Get base value (expected model output)
-            try:
-                if isinstance(self.explainer.expected_value, (list, np.ndarray)):
-                    base_value = float(self.explainer.expected_value[-1])
-                else:
-                    base_value = float(self.explainer.expected_value)
-            except:
-                base_value = 0.5  # Default for binary classification
-            
-            return {
-                'top_factors': feature_importance[:5],  # Top 5 factors
-                'base_value': base_value
-            }
+            return explanations
             
         except Exception as e:
             print(f"⚠️ SHAP Calculation Error:  {e}")
             # Fallback to feature importances
-            return self._fallback_explanation(X_df)
+            return [self._fallback_explanation(X_df.iloc[[r]]) for r in range(len(X_df))]
+
+    @staticmethod
+    def _positive_class_values(shap_values, n_rows: int) -> np.ndarray:
+        """
+        Normalize shap_values() output to a (rows, features) array.
+        
+        Binary classification: list [class0_values, class1_values]
+        Multiclass: list of arrays
+        Regression: single array
+        """
+        if isinstance(shap_values, list):
+            # For binary classification, use positive class (index 1)
+            if len(shap_values) == 2:
+                vals = shap_values[1]
+            else: 
+                vals = shap_values[0]
+        else:
+            vals = shap_values
+        
+        vals = np.asarray(vals)
+        if vals.ndim == 3:
+            # (rows, features, classes) - keep the positive class
+            vals = vals[:, :, -1]
+        return vals.reshape(n_rows, -1)
 
     def _fallback_explanation(self, X_df: pd.DataFrame) -> dict:
         """
@@ -223,37 +487,36 @@ class ExplainabilityEngine:
         Used when SHAP is unavailable or fails.
         """
         try:
+            row_values = X_df.iloc[0].to_numpy()
+            numeric_mask = X_df.dtypes.apply(pd.api.types.is_numeric_dtype).to_numpy()
+            
             # Get feature importances from model
             if hasattr(self.model, 'feature_importances_'):
                 importances = self.model.feature_importances_
             elif hasattr(self.model, 'get_score'):
                 # XGBoost-specific method
                 importance_dict = self.model.get_score(importance_type='weight')
-                importances = [importance_dict.get(f, 0) for f in X_df.columns]
+                importances = pd.Series(importance_dict, dtype=float).reindex(X_df.columns, fill_value=0).to_numpy()
             else:
                 # Ultimate fallback:  use non-zero features
-                importances = np.abs(X_df.iloc[0]. values)
+                importances = np.abs(row_values)
             
-            # Create feature importance list
+            # Top 5 features by importance, only those entries become dicts
+            importances = np.asarray(importances, dtype=float)
+            clean_names = self._clean_names_for(X_df.columns)
             feature_importance = []
-            for i, (name, imp) in enumerate(zip(X_df.columns, importances)):
-                if abs(imp) < 1e-10:
-                    continue
-                
-                feature_value = X_df.iloc[0, i]
+            for i in _top_indices(np.abs(importances)):
+                feature_value = row_values[i]
                 
                 feature_importance.append({
-                    "feature": self._clean_feature_name(name),
-                    "impact": float(imp),
+                    "feature": clean_names[i],
+                    "impact": float(importances[i]),
                     "direction": "positive" if feature_value > 0 else "neutral",
-                    "feature_value":  float(feature_value) if isinstance(feature_value, (int, float)) else str(feature_value)
+                    "feature_value":  float(feature_value) if numeric_mask[i] else str(feature_value)
                 })
             
-            # Sort by importance
-            feature_importance.sort(key=lambda x: abs(x['impact']), reverse=True)
-            
             return {
-                'top_factors': feature_importance[:5],
+                'top_factors': feature_importance,
                 'base_value':  0.5,
                 'method': 'feature_importance_fallback'
             }
@@ -263,6 +526,14 @@ class ExplainabilityEngine:
             # Ultimate fallback: return empty
             return {'top_factors': []}
 
+    def _clean_names_for(self, columns) -> list:
+        """
+        Display names for columns; the precomputed list when they are the model's features.
+        """
+        if len(columns) == len(self._clean_names) and list(columns) == list(self.feature_names):
+            return self._clean_names
+        return [self._clean_feature_name(n) for n in columns]
+
     def _clean_feature_name(self, name: str) -> str:
         """
         Convert technical feature names to human-readable format.
@@ -272,23 +543,9 @@ class ExplainabilityEngine:
             'shipment_volume_change_30d' -> 'Shipment Volume Change (30d)'
             'industry_Technology' -> 'Industry:  Technology'
         """
-        # Feature name mappings
-        name_map = {
-            'amount_log': 'Invoice Amount (log)',
-            'amount':  'Invoice Amount',
-            'days_overdue': 'Days Overdue',
-            'payment_history_score': 'Payment History Score',
-            'shipment_volume_change_30d': 'Shipment Volume Change (30d)',
-            'shipment_volume_30d': 'Shipment Volume (30d)',
-            'express_ratio': 'Express Shipment Ratio',
-            'destination_diversity': 'Shipping Destination Diversity',
-            'email_opened': 'Email Engagement',
-            'dispute_flag': 'Dispute History'
-        }
-        
         # Check direct mapping
-        if name in name_map: 
-            return name_map[name]
+        if name in self.NAME_MAP: 
+            return self.NAME_MAP[name]
         
         # Handle one-hot encoded features (e.g., 'industry_Technology')
         if '_' in name:
@@ -296,7 +553,7 @@ class ExplainabilityEngine:
             if len(parts) == 2:
                 category, value = parts
                 if category in ['industry', 'region']:
-                    return f"{category. title()}: {value}"
+                    return f"{category.title()}: {value}"
         
         # Default:  title case with underscores replaced
         return name.replace('_', ' ').title()
@@ -317,6 +574,21 @@ class ExplainabilityEngine:
         }
 
 
+@functools.lru_cache(maxsize=4)
+def _get_engine(model_path: str, mtime_ns: int) -> ExplainabilityEngine:
+    return ExplainabilityEngine(model_path)
+
+
+def get_engine(model_path: str) -> ExplainabilityEngine:
+    """Return a warm, shared ExplainabilityEngine for model_path, rebuilt when the file changes."""
+    # A missing path keys on 0: the engine falls back to its alternate locations
+    try:
+        mtime_ns = os.stat(model_path).st_mtime_ns
+    except OSError:
+        mtime_ns = 0
+    return _get_engine(model_path, mtime_ns)
+
+
 # ============================================================================
 # STANDALONE TESTING
 # ============================================================================
@@ -336,7 +608,7 @@ if __name__ == "__main__":
     }])
     
     try:
-        engine = ExplainabilityEngine('models/recovery_model.pkl')
+        engine = get_engine('models/recovery_model.pkl')
         print(f"\n✅ Engine Status: {engine.get_summary()}")
         
         explanation = engine.explain_prediction(test_data)
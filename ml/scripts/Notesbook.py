@@ -93,8 +93,11 @@ notebook_content = {
    "outputs": [],
    "source": [
     "# Correlation Heatmap\n",
+    "num = df.select_dtypes('number')\n",
+    "cols = num.columns\n",
+    "corr = np.corrcoef(num.to_numpy(dtype=np.float32).T)\n",
     "plt.figure(figsize=(10,8))\n",
-    "sns.heatmap(df.corr(), annot=True, cmap='coolwarm')\n",
+    "sns.heatmap(corr, xticklabels=cols, yticklabels=cols, annot=True, cmap='coolwarm')\n",
     "plt.title('Feature Correlation Matrix')\n",
     "plt.show()"
    ]
@@ -0,0 +1,89 @@
+"""
+RECOV.AI - Model Export Script
+==============================
+Converts the trained classifier into a faster serving format.
+The backend picks the export up automatically when it sits next to
+recovery_model.pkl and is newer than it.
+
+    python ml/scripts/export_model.py                    # ONNX
+    python ml/scripts/export_model.py --format treelite  # compiled .so (needs gcc)
+
+The Treelite export needs Treelite 4+ and TL2cgen (pip install treelite tl2cgen);
+the backend needs tl2cgen installed to load the library.
+"""
+
+import argparse
+import copy
+import joblib
+from pathlib import Path
+
+# --- CONFIG ---
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+MODEL_PATH = BASE_DIR / "backend" / "models" / "recovery_model.pkl"
+ONNX_PATH = MODEL_PATH.with_suffix(".onnx")
+TREELITE_PATH = MODEL_PATH.with_suffix(".so")
+
+def load_classifier():
+    """Return (classifier, feature_names) from the saved artifact"""
+    artifact = joblib.load(MODEL_PATH)
+    if isinstance(artifact, dict):
+        model = artifact['models']['classifier']
+        feature_names = list(artifact.get('feature_names', []))
+    else:
+        model = artifact
+        feature_names = []
+    
+    if hasattr(model, 'feature_names_in_'):
+        feature_names = list(model.feature_names_in_)
+    if not feature_names:
+        feature_names = [f'f{i}' for i in range(model.n_features_in_)]
+    return model, feature_names
+
+def export_onnx(model, n_features):
+    """Convert to ONNX with a float32 [None, n_features] input named 'X'"""
+    from skl2onnx.common.data_types import FloatTensorType
+    initial_types = [('X', FloatTensorType([None, n_features]))]
+    
+    if type(model).__module__.startswith('xgboost'):
+        from onnxmltools import convert_xgboost
+        # The XGBoost converter only understands positional f0..fN names
+        model = copy.deepcopy(model)
+        model.get_booster().feature_names = None
+        onx = convert_xgboost(model, initial_types=initial_types)
+    else:
+        from skl2onnx import convert_sklearn
+        # zipmap=False keeps probabilities as a plain tensor
+        onx = convert_sklearn(model, initial_types=initial_types,
+                              options={id(model): {'zipmap': False}})
+    
+    ONNX_PATH.write_bytes(onx.SerializeToString())
+    print(f"💾 ONNX model saved to {ONNX_PATH}")
+
+def export_treelite(model):
+    """Import the tree ensemble with Treelite and compile it to a shared library with TL2cgen"""
+    import tl2cgen
+    import treelite
+    import treelite.sklearn
+    
+    if type(model).__module__.startswith('xgboost'):
+        tl_model = treelite.frontend.from_xgboost(model.get_booster())
+    else:
+        tl_model = treelite.sklearn.import_model(model)
+    
+    tl2cgen.export_lib(tl_model, toolchain='gcc', libpath=str(TREELITE_PATH),
+                       params={'parallel_comp': 4}, verbose=False)
+    print(f"💾 Treelite library saved to {TREELITE_PATH}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the recovery model for serving")
+    parser.add_argument('--format', choices=['onnx', 'treelite'], default='onnx')
+    args = parser.parse_args()
+    
+    print(f"✅ Loading model from: {MODEL_PATH}")
+    model, feature_names = load_classifier()
+    print(f"   {type(model).__name__} with {len(feature_names)} features")
+    
+    if args.format == 'treelite':
+        export_treelite(model)
+    else:
+        export_onnx(model, len(feature_names))
@@ -10,9 +10,42 @@ from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, roc_auc_score, classification_report
 from xgboost import XGBClassifier
 import joblib
+import pickle
 from pathlib import Path
 import sys
 import os
+import shutil
+import xgboost as xgb
+
+# Optional: persist a ready-built SHAP explainer next to the model
+try:
+    import shap
+    SHAP_AVAILABLE = True
+except ImportError:
+    SHAP_AVAILABLE = False
+
+# Upper-cased spellings counted as True in boolean columns
+TRUTHY = ('TRUE', '1')
+
+
+def one_hot(series, prefix):
+    """uint8 one-hot block built from Categorical codes (NaN -> all zeros)."""
+    cat = pd.Categorical(series)
+    block = (cat.codes[:, None] == np.arange(len(cat.categories))).astype(np.uint8)
+    return pd.DataFrame(block, index=series.index,
+                        columns=[f"{prefix}_{c}" for c in cat.categories])
+
+
+def xgb_device():
+    """'cuda' when this XGBoost build has CUDA and a GPU is visible (XGB_DEVICE overrides)."""
+    if os.environ.get('XGB_DEVICE'):
+        return os.environ['XGB_DEVICE']
+    try:
+        has_cuda = bool(xgb.build_info().get('USE_CUDA'))
+    except Exception:
+        has_cuda = False
+    return 'cuda' if has_cuda and shutil.which('nvidia-smi') else 'cpu'
+
 
 print("="*70)
 print("  RECOV.AI - MODEL RETRAINING")
@@ -98,24 +131,19 @@ for col, default_val in optional_cols.items():
 # Convert boolean columns
 for col in ['email_opened', 'dispute_flag']:
     if col in df.columns:
-        if df[col].dtype == 'object':
-            df[col] = df[col].map({
-                'TRUE': 1, 'FALSE': 0, 'True': 1, 'False': 0,
-                '1': 1, '0': 0, True: 1, False: 0
-            }).fillna(0).astype(int)
+        s = df[col]
+        if s.dtype == 'object':
+            df[col] = s.astype(str).str.upper().isin(TRUTHY).astype(np.int8)
         else:
-            df[col] = df[col].astype(int)
+            df[col] = s.fillna(0).astype(np.int8)
     else:
         df[col] = 0
 
 # One-hot encode categoricals
-if 'industry' in df.columns:
-    industry_dummies = pd.get_dummies(df['industry'], prefix='industry')
-    df = pd.concat([df, industry_dummies], axis=1)
-
-if 'region' in df.columns:
-    region_dummies = pd.get_dummies(df['region'], prefix='region')
-    df = pd.concat([df, region_dummies], axis=1)
+# (built first, then joined onto the frame in a single concat)
+dummies = [one_hot(df[col], col) for col in ('industry', 'region') if col in df.columns]
+if dummies:
+    df = pd.concat([df, *dummies], axis=1, copy=False)
 
 # ============================================================================
 # 4. PREPARE FEATURES
@@ -136,7 +164,7 @@ feature_cols.extend([col for col in df.columns if col.startswith('region_')])
 available_features = [col for col in feature_cols if col in df.columns]
 print(f"✅ Using {len(available_features)} features")
 
-X = df[available_features]
+X = df[available_features].astype(np.float32)
 y = df['outcome']
 
 print(f"✅ Feature matrix:  {X.shape}")
@@ -159,11 +187,14 @@ model = XGBClassifier(
     colsample_bytree=0.8,
     random_state=42,
     eval_metric='logloss',
-    use_label_encoder=False
+    use_label_encoder=False,
+    tree_method='hist',
+    device=xgb_device(),
+    max_bin=256
 )
 
 model.fit(X_train, y_train)
-print("✅ Model trained")
+print(f"✅ Model trained (device: {model.get_params()['device']})")
 
 # ============================================================================
 # 6. EVALUATE
@@ -193,6 +224,9 @@ else:
 model_dir.mkdir(parents=True, exist_ok=True)
 model_path = model_dir / "recovery_model.pkl"
 
+# The backend scores on CPU; don't ship a model pinned to the training GPU
+model.set_params(device='cpu')
+
 model_package = {
     'models': {'classifier': model},
     'feature_names': available_features,
@@ -203,6 +237,16 @@ model_package = {
     }
 }
 
+# Kept in its own file so loading the model never requires shap
+if SHAP_AVAILABLE:
+    explainer = shap.TreeExplainer(model)
+    explainer_path = model_dir / "recovery_explainer.pkl"
+    with open(explainer_path, 'wb') as f:
+        pickle.dump(explainer, f, protocol=pickle.HIGHEST_PROTOCOL)
+    model_package['explainer'] = explainer_path.name
+    model_package['expected_value'] = float(np.ravel(explainer.expected_value)[-1])
+    print(f"✅ Saved SHAP explainer: {explainer_path}")
+
 joblib.dump(model_package, model_path)
 
 print(f"✅ Saved:  {model_path}")
@@ -246,23 +290,20 @@ if demo_path:
         
         # Boolean
         for col in ['email_opened', 'dispute_flag']:
-            val = str(hero.get(col, '')).upper()
-            hero_data[col] = 1 if val == 'TRUE' else 0
-        
-        hero_df = pd.DataFrame([hero_data])
+            hero_data[col] = np.int8(str(hero.get(col, '')).upper() in TRUTHY)
         
-        # One-hot encode
-        for feat in available_features:
-            if feat.startswith('industry_'):
-                industry_val = feat.replace('industry_', '')
-                hero_df[feat] = 1 if hero.get('industry', '') == industry_val else 0
-            elif feat.startswith('region_'):
-                region_val = feat.replace('region_', '')
-                hero_df[feat] = 1 if hero.get('region', '') == region_val else 0
-            elif feat not in hero_df.columns:
-                hero_df[feat] = 0
+        # One-hot encode: feature -> (column, value), computed once
+        onehot_map = {f: f.split('_', 1) for f in available_features
+                      if f.startswith(('industry_', 'region_'))}
+        hero_row = np.zeros(len(available_features), dtype=np.float32)
+        for i, feat in enumerate(available_features):
+            if feat in onehot_map:
+                category, value = onehot_map[feat]
+                hero_row[i] = hero.get(category, '') == value
+            else:
+                hero_row[i] = hero_data.get(feat, 0)
         
-        hero_df = hero_df[available_features]
+        hero_df = pd.DataFrame([hero_row], columns=available_features)
         
         # Predict
         prob = model.predict_proba(hero_df)[0][1]
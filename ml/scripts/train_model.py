@@ -3,10 +3,34 @@ import numpy as np
 import pickle
 import json
 import os
+import shutil
 from pathlib import Path
+import xgboost as xgb
 from xgboost import XGBClassifier, XGBRegressor
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import StratifiedShuffleSplit
 from sklearn.metrics import accuracy_score, roc_auc_score
+from joblib import Parallel, delayed
+
+# Optional: cuDF keeps the training matrix (and its column names) on the GPU
+try:
+    import cudf
+    CUDF_AVAILABLE = True
+except ImportError:
+    CUDF_AVAILABLE = False
+
+# Optional: Numba fuses label/target generation into a single pass over the rows
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# Optional: pyarrow backs the Parquet cache of the prepped training frame
+try:
+    import pyarrow
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
 
 # --- CONFIG ---
 # Automatically find the project root based on where this file is
@@ -14,49 +38,169 @@ BASE_DIR = Path(__file__).resolve().parent.parent.parent
 DATA_PATH = BASE_DIR / "backend" / "data" / "training_data.csv"
 MODEL_PATH = BASE_DIR / "backend" / "models" / "recovery_model.pkl"
 METADATA_PATH = BASE_DIR / "backend" / "models" / "model_metadata.json"
+PREP_CACHE_PATH = DATA_PATH.with_suffix('.prep.parquet')
+PREP_CACHE_KEY_PATH = PREP_CACHE_PATH.with_suffix('.meta.json')
+# Bump when the prep or target-synthesis logic changes, to invalidate the cache
+PREP_VERSION = 2
 
-def load_and_prep_data():
-    print(f"✅ Loading data from: {DATA_PATH}")
-    if not DATA_PATH.exists():
-        raise FileNotFoundError(f"❌ Data file not found at {DATA_PATH}")
-        
-    df = pd.read_csv(DATA_PATH)
-    
+# Seed for the synthetic targets
+SEED = 42
+
+# Native booster files written next to the pickle, by model_pkg['models'] key
+NATIVE_ARTIFACTS = {
+    'classifier': 'clf.ubj',
+    'regressor': 'reg.ubj'
+}
+
+# Targets of the multi-output regressor, in column order
+REGRESSION_TARGETS = ['days_to_pay', 'recovery_percentage']
+
+# Columns train() actually consumes; everything else in the CSV is skipped
+NEEDED_COLUMNS = [
+    'amount', 'days_overdue', 'payment_history_score',
+    'shipment_volume_change_30d', 'shipment_volume_30d',
+    'express_ratio', 'destination_diversity',
+    'contact_attempts', 'customer_tenure_months', 'outcome'
+]
+
+def xgb_device():
+    """'cuda' when this XGBoost build has CUDA and a GPU is visible (XGB_DEVICE overrides)."""
+    if os.environ.get('XGB_DEVICE'):
+        return os.environ['XGB_DEVICE']
+    try:
+        has_cuda = bool(xgb.build_info().get('USE_CUDA'))
+    except Exception:
+        has_cuda = False
+    return 'cuda' if has_cuda and shutil.which('nvidia-smi') else 'cpu'
+
+def _train(est, dtrain):
+    """Train est's booster on a prebuilt QuantileDMatrix and load it back into est."""
+    booster = xgb.train(est.get_xgb_params(), dtrain, num_boost_round=est.n_estimators)
+    est.load_model(bytearray(booster.save_raw('ubj')))
+    return est
+
+def predict_targets(reg, mean, std, X):
+    """Unpack the multi-output regressor into (days_to_pay, recovery_percentage)."""
+    pred = reg.predict(X) * np.asarray(std) + np.asarray(mean)
+    return pred[:, 0], pred[:, 1]
+
+def _draw_targets(rng, n):
+    """One draw per row for every branch, so both synthesis paths consume the same stream."""
+    return rng.uniform(0.7, 1.0, n), rng.uniform(0.0, 0.4, n), rng.integers(5, 30, n)
+
+def _synthesize_numpy(df, rng):
+    """Synthetic labels/targets and amount_log, one vectorized pass per column."""
     # --- 1. AUTO-FIX: Generate 'outcome' if missing ---
     if 'outcome' not in df.columns:
         print("⚠️ 'outcome' column missing. Generating synthetic labels based on logic...")
         # Rule: If payment history is good (>0.6) AND not too overdue (<70 days), they likely pay (1)
-        df['outcome'] = np.where(
-            (df['payment_history_score'] > 0.60) & (df['days_overdue'] < 70), 
-            1, 
-            0
-        )
+        # (compared in float32, like the column itself)
+        df['outcome'] = ((df['payment_history_score'] > np.float32(0.60)) & (df['days_overdue'] < 70)).astype(np.int8)
         print("✅ Synthetic 'outcome' labels generated.")
 
     # --- 2. AUTO-FIX: Generate Regression Targets ---
     print("🔄 Generating synthetic regression targets...")
-    np.random.seed(42)
+    pos = df['outcome'].to_numpy() == 1
+    hi, lo, lag = _draw_targets(rng, len(df))
     
     # Recovery Percentage: High for outcome 1, Low for outcome 0
-    df['recovery_percentage'] = np.where(
-        df['outcome'] == 1,
-        np.random.uniform(0.7, 1.0, size=len(df)),
-        np.random.uniform(0.0, 0.4, size=len(df))
-    )
+    df['recovery_percentage'] = np.where(pos, hi, lo).astype(np.float32)
     
-    # Days to Pay: Low for outcome 1, High for outcome 0
-    random_lag = np.random.randint(5, 30, size=len(df))
-    df['days_to_pay'] = np.where(
-        df['outcome'] == 1,
-        df['days_overdue'] + random_lag,
-        180 # Cap for non-payment
-    )
+    # Days to Pay: Low for outcome 1, High for outcome 0 (180 caps non-payment)
+    df['days_to_pay'] = np.where(pos, df['days_overdue'].to_numpy() + lag, 180).astype(np.float32)
     
     # --- 3. Feature Engineering ---
+    _add_amount_log(df)
+
+def _add_amount_log(df):
+    """amount_log = log1p(amount), computed in float32."""
     if 'amount' in df.columns:
-        df['amount_log'] = np.log1p(df['amount'])
+        amt = df['amount'].to_numpy(dtype=np.float32, copy=False)
+        out = np.empty_like(amt)
+        np.log1p(amt, out=out)
+        df['amount_log'] = out
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _synthesize_kernel(score, overdue, outcome, make_outcome, hi, lo, lag,
+                           out_pct, out_days):
+        for i in range(score.shape[0]):
+            if make_outcome:
+                # Rule: good payment history (>0.6) AND not too overdue (<70 days),
+                # compared in float32 like _synthesize_numpy()
+                outcome[i] = 1 if (score[i] > np.float32(0.60) and overdue[i] < 70) else 0
+            if outcome[i] == 1:
+                out_pct[i] = hi[i]
+                out_days[i] = overdue[i] + lag[i]
+            else:
+                out_pct[i] = lo[i]
+                out_days[i] = 180.0  # Cap for non-payment
+
+def _synthesize_jit(df, rng):
+    """Same columns as _synthesize_numpy(), labels and targets written by one fused Numba sweep."""
+    n = len(df)
+    make_outcome = 'outcome' not in df.columns
+    if make_outcome:
+        print("⚠️ 'outcome' column missing. Generating synthetic labels based on logic...")
+    print("🔄 Generating synthetic regression targets...")
+    
+    outcome = np.zeros(n, dtype=np.int8) if make_outcome else df['outcome'].to_numpy()
+    hi, lo, lag = _draw_targets(rng, n)
+    rec = np.empty(n, dtype=np.float32)
+    d2p = np.empty(n, dtype=np.float32)
     
-    df.fillna(0, inplace=True)
+    _synthesize_kernel(
+        df['payment_history_score'].to_numpy(dtype=np.float32, copy=False),
+        df['days_overdue'].to_numpy(dtype=np.float32, copy=False),
+        outcome, make_outcome, hi, lo, lag, rec, d2p
+    )
+    
+    if make_outcome:
+        df['outcome'] = outcome
+        print("✅ Synthetic 'outcome' labels generated.")
+    df['recovery_percentage'] = rec
+    df['days_to_pay'] = d2p
+    # NumPy's float32 log1p, so amount_log matches the NumPy path bit for bit
+    _add_amount_log(df)
+
+def load_and_prep_data(seed=SEED):
+    print(f"✅ Loading data from: {DATA_PATH}")
+    if not DATA_PATH.exists():
+        raise FileNotFoundError(f"❌ Data file not found at {DATA_PATH}")
+    
+    # Reuse the prepped frame while the CSV, columns and prep logic are unchanged
+    stat = DATA_PATH.stat()
+    cache_key = [PREP_VERSION, stat.st_mtime_ns, stat.st_size, seed, NEEDED_COLUMNS]
+    if (PYARROW_AVAILABLE and PREP_CACHE_PATH.exists() and PREP_CACHE_KEY_PATH.exists()
+            and json.loads(PREP_CACHE_KEY_PATH.read_text()) == cache_key):
+        print(f"⚡ Using cached prepped data: {PREP_CACHE_PATH}")
+        return pd.read_parquet(PREP_CACHE_PATH, engine='pyarrow')
+        
+    df = pd.read_csv(
+        DATA_PATH,
+        usecols=lambda c: c in NEEDED_COLUMNS,
+        dtype={c: np.float32 for c in NEEDED_COLUMNS if c != 'outcome'},
+        engine='c'
+    )
+    
+    # Outcome (if missing), regression targets and amount_log; both paths
+    # draw from the same PCG64 stream and produce identical frames
+    rng = np.random.Generator(np.random.PCG64(seed))
+    if NUMBA_AVAILABLE:
+        _synthesize_jit(df, rng)
+    else:
+        _synthesize_numpy(df, rng)
+    
+    num_cols = df.select_dtypes(include='number').columns
+    df[num_cols] = df[num_cols].fillna(0)
+    df['outcome'] = df['outcome'].astype(np.int8, copy=False)
+    
+    if PYARROW_AVAILABLE:
+        try:
+            df.to_parquet(PREP_CACHE_PATH, engine='pyarrow', compression='snappy')
+            PREP_CACHE_KEY_PATH.write_text(json.dumps(cache_key))
+        except OSError as e:
+            print(f"⚠️ Could not cache prepped data: {e}")
     return df
 
 def train():
@@ -71,67 +215,119 @@ def train():
     ]
     
     # Verify columns exist
-    available_features = [f for f in features if f in df.columns]
+    cols = frozenset(df.columns)
+    available_features = [f for f in features if f in cols]
+    missing = [f for f in features if f not in cols]
+    if missing:
+        print(f"⚠️ missing features skipped: {missing}")
     print(f"features used: {available_features}")
     
-    X = df[available_features]
+    X = df.loc[:, available_features].astype(np.float32, copy=False)
     y_class = df['outcome']
     y_days = df['days_to_pay']
     y_pct = df['recovery_percentage']
     
-    # Train/Test Split
-    X_train, X_test, y_train, y_test = train_test_split(X, y_class, test_size=0.2, random_state=42)
-    _, _, y_days_train, y_days_test = train_test_split(X, y_days, test_size=0.2, random_state=42)
-    _, _, y_pct_train, y_pct_test = train_test_split(X, y_pct, test_size=0.2, random_state=42)
+    # Train/Test Split: one stratified shuffle, indices shared by all three targets
+    sss = StratifiedShuffleSplit(n_splits=1, test_size=0.2, random_state=42)
+    (train_idx, test_idx), = sss.split(X, y_class)
+    X_train, X_test = X.iloc[train_idx], X.iloc[test_idx]
+    y_train, y_test = y_class.iloc[train_idx], y_class.iloc[test_idx]
+    y_days_train, y_days_test = y_days.iloc[train_idx], y_days.iloc[test_idx]
+    y_pct_train, y_pct_test = y_pct.iloc[train_idx], y_pct.iloc[test_idx]
     
-    # --- 1. Train Classifier (Risk Level) ---
-    print("\n🤖 Training XGBoost Classifier...")
-    clf = XGBClassifier(n_estimators=100, learning_rate=0.1, max_depth=5, use_label_encoder=False, eval_metric='logloss')
-    clf.fit(X_train, y_train)
+    device = xgb_device()
+    print(f"\n🖥️  Training device: {device}")
     
-    y_pred = clf.predict(X_test)
+    # Move the training matrix to the GPU once, not once per booster
+    X_fit = cudf.from_pandas(X_train) if device == 'cuda' and CUDF_AVAILABLE else X_train
+    
+    # Split the cores between the two boosters so they don't oversubscribe
+    n_jobs = max(1, (os.cpu_count() or 1) // 2)
+    
+    # Days and % share one booster; standardize them to comparable scales
+    Y_reg = np.column_stack([y_days_train, y_pct_train]).astype(np.float32)
+    reg_mean = Y_reg.mean(axis=0)
+    reg_std = Y_reg.std(axis=0)
+    reg_std[reg_std == 0] = 1.0
+    Y_reg = (Y_reg - reg_mean) / reg_std
+    
+    # --- 1. Classifier (Risk Level) + 2. Multi-output Regressor (Days & %) ---
+    clf = XGBClassifier(n_estimators=100, learning_rate=0.1, max_depth=5, tree_method="hist", device=device, eval_metric='logloss', n_jobs=n_jobs)
+    # multi_output_tree is a CPU hist feature
+    reg = XGBRegressor(n_estimators=100, max_depth=5, tree_method="hist", device="cpu", multi_strategy="multi_output_tree", n_jobs=n_jobs)
+    
+    # Quantize the features once; the regressor reuses the classifier's cut points
+    # (only when both live on the CPU)
+    dtrain_cls = xgb.QuantileDMatrix(X_fit, label=y_train)
+    dtrain_reg = xgb.QuantileDMatrix(X_train, label=Y_reg, ref=dtrain_cls if X_fit is X_train else None)
+    
+    # Independent fits; XGBoost releases the GIL, so threads overlap them
+    print("\n🤖 Training XGBoost Classifier + Regressor in parallel...")
+    clf, reg = Parallel(n_jobs=2, backend="threading")(
+        delayed(_train)(est, dtrain)
+        for est, dtrain in ((clf, dtrain_cls), (reg, dtrain_reg))
+    )
+    
+    # One prediction pass; ROC-AUC scores the probabilities, not hard labels
+    proba = clf.predict_proba(X_test)[:, 1]
+    y_pred = (proba > 0.5).astype(np.int8)
     acc = accuracy_score(y_test, y_pred)
-    roc = roc_auc_score(y_test, y_pred)
+    roc = roc_auc_score(y_test, proba)
     
     print(f"   🏆 Classifier Accuracy: {acc:.4f}")
     print(f"   🏆 ROC-AUC Score: {roc:.4f}")
-
-    # --- 2. Train Regressors (Days & %) ---
-    print("\n🤖 Training XGBoost Regressors...")
-    reg_days = XGBRegressor(n_estimators=100, max_depth=5)
-    reg_days.fit(X_train, y_days_train)
-    
-    reg_pct = XGBRegressor(n_estimators=100, max_depth=5)
-    reg_pct.fit(X_train, y_pct_train)
     
-    print("   ✅ Regressors Trained")
+    days_pred, pct_pred = predict_targets(reg, reg_mean, reg_std, X_test)
+    print(f"   ✅ Regressor Trained (MAE days: {np.abs(days_pred - y_days_test.to_numpy()).mean():.2f}, "
+          f"MAE %: {np.abs(pct_pred - y_pct_test.to_numpy()).mean():.3f})")
 
     # --- 3. Save Everything ---
+    # The backend scores on CPU; keep the pickle portable
+    clf.set_params(device="cpu")
+    
     model_pkg = {
         'models': {
             'classifier': clf,
-            'regressor_days': reg_days,
-            'regressor_pct': reg_pct
+            'regressor': reg
         },
-        'feature_names': available_features
+        'feature_names': available_features,
+        # reg predicts standardized REGRESSION_TARGETS; see predict_targets()
+        'regression_targets': REGRESSION_TARGETS,
+        'target_mean': reg_mean.tolist(),
+        'target_std': reg_std.tolist()
     }
     
-    # Create directory if it doesn't exist
-    os.makedirs(MODEL_PATH.parent, exist_ok=True)
-    
-    with open(MODEL_PATH, 'wb') as f:
-        pickle.dump(model_pkg, f)
+    # Write to a temp file beside the model, then publish atomically so a
+    # concurrent reader never sees a truncated pickle
+    tmp = MODEL_PATH.with_suffix('.pkl.tmp')
+    tmp.parent.mkdir(parents=True, exist_ok=True)
+    with open(tmp, 'wb', buffering=1 << 20) as f:
+        pickle.dump(model_pkg, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, MODEL_PATH)
         
     print(f"\n💾 Model saved to {MODEL_PATH}")
     
+    # Native UBJSON boosters: faster to write and portable across XGBoost versions
+    artifacts = {}
+    for name, model in model_pkg['models'].items():
+        artifacts[name] = NATIVE_ARTIFACTS[name]
+        model.save_model(MODEL_PATH.parent / NATIVE_ARTIFACTS[name])
+    print(f"💾 Native boosters saved: {', '.join(artifacts.values())}")
+    
     # Save Metadata
     meta = {
         'accuracy': float(acc),
         'roc_auc': float(roc),
-        'features': available_features
+        'features': available_features,
+        'feature_names': available_features,
+        'artifacts': artifacts,
+        'regression_targets': REGRESSION_TARGETS,
+        'target_mean': reg_mean.tolist(),
+        'target_std': reg_std.tolist()
     }
-    with open(METADATA_PATH, 'w') as f:
-        json.dump(meta, f, indent=2)
+    tmp = METADATA_PATH.with_suffix('.json.tmp')
+    tmp.write_text(json.dumps(meta, indent=2))
+    os.replace(tmp, METADATA_PATH)
 
 if __name__ == "__main__":
     train()
\ No newline at end of file
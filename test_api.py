@@ -5,25 +5,75 @@ Tests all Day 3 endpoints.
 """
 
 import requests
+from requests.adapters import HTTPAdapter
 import json
+import mmap
 import os
+import io
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Optional: stream multipart uploads instead of building the body in memory
+try:
+    from requests_toolbelt import MultipartEncoder
+    TOOLBELT_AVAILABLE = True
+except ImportError:
+    TOOLBELT_AVAILABLE = False
 
 # Configuration
 API_URL = "http://127.0.0.1:8000"
 DEMO_CSV = "backend/data/demo_data.csv"
 
+# One keep-alive connection pool shared by every test
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+
+# Concurrent tests print into a per-thread buffer so their reports don't interleave
+_thread_output = threading.local()
+
+class _PerThreadStdout:
+    """Route writes to the current thread's buffer, if it has one"""
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, text):
+        return (getattr(_thread_output, 'buf', None) or self.stream).write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+def _run_buffered(test_fn):
+    """Run a test with its report captured; returns (result, report)"""
+    _thread_output.buf = io.StringIO()
+    try:
+        return test_fn(), _thread_output.buf.getvalue()
+    finally:
+        _thread_output.buf = None
+
 def print_section(title):
     """Print formatted section header"""
     print("\n" + "="*70)
     print(f"  {title}")
     print("="*70)
 
+def upload_demo_csv():
+    """POST the demo CSV to /analyze (streamed when requests-toolbelt is installed)"""
+    with open(DEMO_CSV, 'rb') as f:
+        if TOOLBELT_AVAILABLE:
+            enc = MultipartEncoder(fields={'file': ('demo_data.csv', f, 'text/csv')})
+            return SESSION.post(f"{API_URL}/analyze", data=enc, headers={'Content-Type': enc.content_type})
+        
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as csv_map:
+            files = {'file': ('demo_data.csv', csv_map, 'text/csv')}
+            return SESSION.post(f"{API_URL}/analyze", files=files)
+
 def test_health_check():
     """Test 1: Health check endpoint"""
     print_section("TEST 1: Health Check (GET /)")
     
     try:
-        response = requests.get(f"{API_URL}/")
+        response = SESSION.get(f"{API_URL}/")
         print(f"✅ Status Code: {response.status_code}")
         print(f"📄 Response:\n{json.dumps(response.json(), indent=2)}")
         return response.status_code == 200
@@ -50,7 +100,7 @@ def test_single_prediction():
     }
     
     try:
-        response = requests. post(f"{API_URL}/predict", json=test_account)
+        response = SESSION.post(f"{API_URL}/predict", json=test_account)
         print(f"✅ Status Code: {response.status_code}")
         
         if response.status_code == 200:
@@ -78,19 +128,17 @@ def test_single_prediction():
         return False
 
 def test_csv_upload():
-    """Test 3: CSV file upload and batch analysis"""
+    """Test 3: CSV file upload and batch analysis (returns the /analyze payload, or None)"""
     print_section("TEST 3: CSV Upload (POST /analyze)")
     
     # Check if demo CSV exists
     if not os. path.exists(DEMO_CSV):
         print(f"❌ Demo CSV not found:  {DEMO_CSV}")
         print(f"   Please ensure demo_data.csv exists in backend/data/")
-        return False
+        return None
     
     try:
-        with open(DEMO_CSV, 'rb') as f:
-            files = {'file': ('demo_data.csv', f, 'text/csv')}
-            response = requests.post(f"{API_URL}/analyze", files=files)
+        response = upload_demo_csv()
         
         print(f"✅ Status Code: {response.status_code}")
         
@@ -111,47 +159,45 @@ def test_csv_upload():
                 print(f"     Probability: {first['recovery_probability']:.1%}")
                 print(f"     DCA: {first['recommended_dca']['name']}")
             
-            return True
+            return result
         else: 
             print(f"❌ Error: {response.text}")
-            return False
+            return None
             
     except Exception as e:
         print(f"❌ Error: {e}")
-        return False
+        return None
 
-def test_get_account():
-    """Test 4: Get specific account"""
+def test_get_account(analyze_result=None):
+    """Test 4: Get specific account (reuses a prior /analyze payload when given)"""
     print_section("TEST 4: Get Account (GET /account/{id})")
     
-    # First, upload CSV to populate database
-    print("📤 Uploading CSV first to populate database...")
-    
-    if not os.path.exists(DEMO_CSV):
-        print(f"❌ Demo CSV not found:  {DEMO_CSV}")
-        return False
-    
     try: 
-        # Upload CSV
-        with open(DEMO_CSV, 'rb') as f:
-            files = {'file': ('demo_data.csv', f, 'text/csv')}
-            upload_response = requests.post(f"{API_URL}/analyze", files=files)
-        
-        if upload_response.status_code != 200:
-            print(f"❌ CSV upload failed: {upload_response. text}")
-            return False
-        
-        # Get first account ID from upload response
-        upload_result = upload_response.json()
-        if not upload_result['predictions']:
-            print("❌ No accounts found in CSV")
-            return False
+        if not (analyze_result and analyze_result['predictions']):
+            # No usable upload yet: upload CSV to populate database
+            print("📤 Uploading CSV first to populate database...")
+            
+            if not os.path.exists(DEMO_CSV):
+                print(f"❌ Demo CSV not found:  {DEMO_CSV}")
+                return False
+            
+            upload_response = upload_demo_csv()
+            
+            if upload_response.status_code != 200:
+                print(f"❌ CSV upload failed: {upload_response.text}")
+                return False
+            
+            analyze_result = upload_response.json()
+            if not analyze_result['predictions']:
+                print("❌ No accounts found in CSV")
+                return False
         
-        account_id = upload_result['predictions'][0]['account_id']
+        # First account ID from the upload response
+        account_id = analyze_result['predictions'][0]['account_id']
         print(f"✅ CSV uploaded.  Testing GET for account:  {account_id}")
         
         # Now test GET endpoint
-        response = requests.get(f"{API_URL}/account/{account_id}")
+        response = SESSION.get(f"{API_URL}/account/{account_id}")
         print(f"\n✅ Status Code: {response.status_code}")
         
         if response.status_code == 200:
@@ -172,17 +218,74 @@ def test_get_account():
         print(f"❌ Error:  {e}")
         return False
 
+def test_postprocess_parity():
+    """Test 5: scalar and Numba post-processing match the NumPy reference"""
+    print_section("TEST 5: Post-processing Parity (predictor, in-process)")
+    
+    try:
+        import numpy as np
+        from backend import predictor
+    except ImportError as e:
+        print(f"⏭️ Skipped (backend dependencies not installed: {e})")
+        return True
+    
+    # Fine grid plus the tier boundaries and their neighbours
+    edges = np.array([0.4, 0.6, 0.8])
+    probs = np.concatenate([np.linspace(0.0, 1.0, 1001), edges,
+                            np.nextafter(edges, 0), np.nextafter(edges, 1)])
+    days = np.linspace(0.0, 400.0, probs.size)
+    reference = predictor._postprocess_numpy(probs, days)
+    
+    # Scalar path (predict_recovery) against the batch reference
+    scalar = np.array([predictor._score_tier(p) for p in probs.tolist()])
+    ok = np.array_equal(scalar, np.column_stack(reference[:2]))
+    print(f"{'✅' if ok else '❌'} scalar tier/expected_days")
+    
+    if not predictor.NUMBA_AVAILABLE:
+        print("⏭️ Numba kernel skipped (numba not installed)")
+        return ok
+    
+    names = ("tier", "expected_days", "velocity", "days_impact")
+    for name, jit_out, np_out in zip(names, predictor._postprocess_jit(probs, days), reference):
+        same = (np.array_equal(jit_out, np_out) if np_out.dtype.kind == 'i'
+                else np.allclose(jit_out, np_out, rtol=0, atol=1e-12))
+        print(f"{'✅' if same else '❌'} jit {name}")
+        ok = ok and same
+    return ok
+
 def run_all_tests():
     """Run all API tests"""
     print("\n" + "🚀"*35)
     print("  RECOV.AI - API TEST SUITE")
     print("🚀"*35)
     
+    # Independent tests run concurrently on the shared Session, each report
+    # buffered and printed in order; Get Account waits for the upload, which
+    # populates the account store
+    tests = {
+        "Health Check": test_health_check,
+        "Single Prediction": test_single_prediction,
+        "CSV Upload": test_csv_upload,
+    }
+    stdout = sys.stdout
+    sys.stdout = _PerThreadStdout(stdout)
+    try:
+        with ThreadPoolExecutor(max_workers=4) as ex:
+            futures = {name: ex.submit(_run_buffered, fn) for name, fn in tests.items()}
+            outcomes = {}
+            for name, future in futures.items():
+                outcomes[name], report = future.result()
+                print(report, end="")
+    finally:
+        sys.stdout = stdout
+    
+    analyze_result = outcomes["CSV Upload"]
     results = {
-        "Health Check": test_health_check(),
-        "Single Prediction": test_single_prediction(),
-        "CSV Upload": test_csv_upload(),
-        "Get Account": test_get_account()
+        "Health Check": outcomes["Health Check"],
+        "Single Prediction": outcomes["Single Prediction"],
+        "CSV Upload": analyze_result is not None,
+        "Get Account": test_get_account(analyze_result),
+        "Postprocess Parity": test_postprocess_parity()
     }
     
     # Summary
@@ -209,7 +312,7 @@ def run_all_tests():
 if __name__ == "__main__":
     # Check if server is running
     try:
-        requests.get(f"{API_URL}/", timeout=2)
+        SESSION.get(f"{API_URL}/", timeout=2)
     except:
         print("\n❌ ERROR: Backend server not running!")
         print("   Please start the server first:")